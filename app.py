@@ -1,72 +1,461 @@
+# gevent must patch the standard library before anything else imports it, so
+# blocking subprocess pipe reads in the SSE streams yield to other greenlets.
+from gevent import monkey
+monkey.patch_all()
+
 import os
+import functools
+import http.client
+import socket
+import selectors
 import subprocess
 import threading
 import time
 import json
+import gzip
 import shutil
+import struct
+import re
 import logging
 import psutil
+import requests
+from urllib3.util.retry import Retry
 from collections import deque
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response
-from github import Github, GithubException
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from gevent.pywsgi import WSGIServer
 import config
 
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Lets jsonify() and request.get_json() use orjson's C encoder/decoder.
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_INDENT_2 if kwargs.get('indent') else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # --- Setup Logging ---
 logging.basicConfig(
     filename='sakadeploy.log',
-    level=logging.DEBUG,
+    # DEBUG is opt-in (SAKADEPLOY_LOG_LEVEL=DEBUG); it logs every request.
+    level=os.environ.get('SAKADEPLOY_LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+SECRET_KEY_FILE = 'secret_key.bin'
+SECRET_KEY_BYTES = 24
+
+def load_secret_key():
+    # A persisted key keeps sessions valid across restarts and identical in every worker process.
+    while True:
+        try:
+            with open(SECRET_KEY_FILE, 'rb') as f:
+                key = f.read()
+            if len(key) >= SECRET_KEY_BYTES:
+                return key
+            # Truncated by a crash mid-write (possible before keys were linked into place); replace it.
+            logging.warning(f"{SECRET_KEY_FILE} is too short to be a key; generating a new one.")
+            os.remove(SECRET_KEY_FILE)
+        except FileNotFoundError:
+            pass
+        key = os.urandom(SECRET_KEY_BYTES)
+        # Write the whole key under a private name, then link it into place: the key file only
+        # ever appears complete, and if another worker linked theirs first, the loop reads it.
+        tmp_path = f"{SECRET_KEY_FILE}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp_path, SECRET_KEY_FILE)
+            return key
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
 app = Flask(__name__, static_folder='static', template_folder='templates')
-app.secret_key = os.urandom(24)
+app.secret_key = load_secret_key()
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 @app.before_request
 def log_request_info():
-    app.logger.debug(f"Request: {request.method} {request.path} from {request.remote_addr}")
+    # The dashboard polls /api/* every second; logging those would flood the log.
+    if not request.path.startswith('/api/'):
+        app.logger.debug("Request: %s %s from %s", request.method, request.path, request.remote_addr)
 
 # --- Constants ---
 REPO_CACHE_FILE = 'repo_cache.json'
-STATS_FILE = 'system_stats.log'
-MAX_STATS_LINES = 1000
+REPO_CACHE_EXPIRY_SECONDS = 15 * 60 # Starting TTL; adapted per cache below
+REPO_CACHE_MAX_TTL_SECONDS = 24 * 60 * 60
+REPO_CACHE_MANUAL_REFRESH_TTL_SECONDS = 60
+REPO_CACHE_REFRESH_LEAD_SECONDS = 60 # Refresh this long before the cache expires
+REPO_CACHE_FULL_FETCH_EVERY = 4 # Every Nth background refresh refetches in full instead of trusting the ETag
+GITHUB_GRAPHQL_URL = 'https://api.github.com/graphql'
+# Most recently pushed first, so new or pushed-to repositories change the ETag of the first page.
+# Removals and access changes past the first 100 don't, hence REPO_CACHE_FULL_FETCH_EVERY.
+GITHUB_REPOS_URL = 'https://api.github.com/user/repos?per_page=100&sort=pushed'
+REPO_LIST_QUERY = """
+query($cursor: String) {
+  viewer {
+    repositories(first: 100, after: $cursor, affiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER], ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]) {
+      nodes { name nameWithOwner isEmpty }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+STATS_FILE = 'system_stats.bin'
+# One fixed-size record per sample: ts, cpu, ram, disk, net_sent, net_recv.
+STATS_RECORD = struct.Struct('<I5f')
+MAX_STATS_SAMPLES = 1000 # Slots in the STATS_FILE ring, and samples kept in memory
 STATS_INTERVAL_SECONDS = 2
+DISK_SAMPLE_INTERVAL_SECONDS = 60
+CONTAINERS_CACHE_TTL_SECONDS = 2
+CONTAINERS_CACHE_MAX_AGE_SECONDS = 30 # Used instead while docker events invalidate the cache
+DOCKER_EVENTS_RETRY_SECONDS = 10 # First retry delay; doubles on each failure up to the max
+DOCKER_EVENTS_MAX_RETRY_SECONDS = 5 * 60
+CONTAINER_STATE_EVENTS = ('create', 'start', 'restart', 'stop', 'die', 'kill', 'pause', 'unpause', 'destroy', 'rename', 'health_status')
+DOCKER_SOCKET_PATH = '/var/run/docker.sock'
+# The container fields the dashboard renders; everything else docker reports is dropped.
+CONTAINER_FIELDS = ('ID', 'Names', 'Image', 'Ports', 'State', 'Status')
+# Picks the compose project and service out of docker ps's comma-separated Labels string.
+COMPOSE_LABEL_RE = re.compile(r'(?:^|,)com\.docker\.compose\.(project|service)=([^,]*)')
+DEPLOY_ROOT = '/var/deploy'
+COMPOSE_FILE_NAME = 'docker-compose.yml'
+DOCKER_COMPOSE = ('docker', 'compose')
+# Arguments for the simple /run_docker_action commands, after 'docker' or 'docker compose -f <file>'.
+DOCKER_ACTION_ARGS = {
+    'start': ('start',),
+    'stop': ('stop',),
+    'prune': ('down', '--remove-orphans'),
+    'build_no_cache': ('build', '--no-cache'),
+    'prune_images': ('image', 'prune', '-a', '-f'),
+    'prune_containers': ('container', 'prune', '-f'),
+}
+SSE_FLUSH_BYTES = 4096
+SSE_FLUSH_SECONDS = 0.1
+SSE_KEEPALIVE_SECONDS = 15
+SSE_PREFIX = b'data: '
+SSE_LINE_BREAK = b'\ndata: '
+SSE_SUFFIX = b'\n\n'
+SSE_KEEPALIVE = b': keepalive\n\n'
+
+def atomic_write(path, data):
+    # Readers see either the old file or the complete new one, never a partial write.
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
 
 # --- System Stats Background Thread ---
 stats_thread = None
 stop_stats_thread = threading.Event()
 last_net_io = psutil.net_io_counters()
+stats_buffer = deque(maxlen=MAX_STATS_SAMPLES)
+stats_lock = threading.Lock()
+# Pre-rendered (json, gzipped json) body for /api/system_stats, swapped whole on every sample.
+stats_payload = (b'[]', gzip.compress(b'[]'))
+
+def render_stats_payload():
+    global stats_payload
+    with stats_lock:
+        body = json_dumps(list(stats_buffer))
+    stats_payload = (body, gzip.compress(body, compresslevel=6))
+
+def pack_stats_sample(sample):
+    return STATS_RECORD.pack(sample['ts'], sample['cpu'], sample['ram'], sample['disk'], sample['net_sent'], sample['net_recv'])
+
+def unpack_stats_samples(data):
+    samples = []
+    for ts, cpu, ram, disk, net_sent, net_recv in STATS_RECORD.iter_unpack(data):
+        if ts: # Slots that were never written are zero-filled
+            samples.append({
+                'ts': ts, 'cpu': round(cpu, 1), 'ram': round(ram, 1), 'disk': round(disk, 1),
+                'net_sent': round(net_sent, 2), 'net_recv': round(net_recv, 2)
+            })
+    return samples
+
+def load_stats_history():
+    # Seed the in-memory buffer once so restarts keep the existing history.
+    # A plain read rather than mmap: the ring is at most MAX_STATS_SAMPLES * 24 bytes and is read once.
+    try:
+        with open(STATS_FILE, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return
+    # Ignore a trailing partial record.
+    data = data[:len(data) - len(data) % STATS_RECORD.size]
+    # After wrapping, the ring's slots aren't in time order.
+    samples = sorted(unpack_stats_samples(data), key=lambda sample: sample['ts'])
+    with stats_lock:
+        stats_buffer.extend(samples)
+    render_stats_payload()
+
+def reset_stats_file():
+    # Rewrite the ring oldest-first from the in-memory samples and return the next slot to write.
+    with stats_lock:
+        samples = list(stats_buffer)
+    atomic_write(STATS_FILE, b''.join(pack_stats_sample(sample) for sample in samples))
+    return len(samples) % MAX_STATS_SAMPLES
 
 def collect_system_stats():
     global last_net_io
-    while not stop_stats_thread.is_set():
+    load_stats_history()
+    next_slot = reset_stats_file()
+    # Opened once for the life of the thread, so each sample costs a single pwrite.
+    stats_fd = os.open(STATS_FILE, os.O_WRONLY | os.O_CREAT, 0o644)
+    disk = None
+    disk_sampled_at = None
+    # Prime cpu_percent and the network counters so the first sample covers a full interval.
+    psutil.cpu_percent(interval=None)
+    last_net_io = psutil.net_io_counters()
+    last_sampled_at = time.monotonic()
+    next_tick = last_sampled_at + STATS_INTERVAL_SECONDS
+    # Waiting on the stop event instead of sleeping makes shutdown immediate.
+    while not stop_stats_thread.wait(max(0, next_tick - time.monotonic())):
+        now = time.monotonic()
+        # Step from the previous target rather than from now, so sampling time doesn't add up as drift.
+        next_tick += STATS_INTERVAL_SECONDS
+        if next_tick <= now:
+            # More than a whole interval behind (e.g. the host was suspended); don't burst to catch up.
+            next_tick = now + STATS_INTERVAL_SECONDS
+        elapsed = now - last_sampled_at
+        last_sampled_at = now
         try:
-            time.sleep(STATS_INTERVAL_SECONDS)
-            cpu = psutil.cpu_percent()
+            cpu = psutil.cpu_percent(interval=None)
             ram = psutil.virtual_memory().percent
-            disk = psutil.disk_usage('/').percent
+            # Disk usage moves slowly, so statvfs only runs once per DISK_SAMPLE_INTERVAL_SECONDS.
+            if disk_sampled_at is None or time.monotonic() - disk_sampled_at >= DISK_SAMPLE_INTERVAL_SECONDS:
+                disk = psutil.disk_usage('/').percent
+                disk_sampled_at = time.monotonic()
             timestamp = int(time.time())
             current_net_io = psutil.net_io_counters()
             bytes_sent = current_net_io.bytes_sent - last_net_io.bytes_sent
             bytes_recv = current_net_io.bytes_recv - last_net_io.bytes_recv
             last_net_io = current_net_io
-            mbps_sent = (bytes_sent * 8) / (STATS_INTERVAL_SECONDS * 1024 * 1024)
-            mbps_recv = (bytes_recv * 8) / (STATS_INTERVAL_SECONDS * 1024 * 1024)
+            # Rates use the measured interval, so a late tick doesn't overstate throughput.
+            mbps_sent = (bytes_sent * 8) / (elapsed * 1024 * 1024)
+            mbps_recv = (bytes_recv * 8) / (elapsed * 1024 * 1024)
             
-            line = json.dumps({
+            sample = {
                 'ts': timestamp, 'cpu': cpu, 'ram': ram, 'disk': disk,
                 'net_sent': round(mbps_sent, 2), 'net_recv': round(mbps_recv, 2)
-            })
+            }
             
-            lines = deque(maxlen=MAX_STATS_LINES - 1)
-            if os.path.exists(STATS_FILE):
-                with open(STATS_FILE, 'r') as f:
-                    lines.extend(f.readlines())
-            lines.append(line + '\n')
-            with open(STATS_FILE, 'w') as f:
-                f.writelines(lines)
+            with stats_lock:
+                stats_buffer.append(sample)
+            render_stats_payload()
+            # Overwrite the oldest slot in place; the file never grows past MAX_STATS_SAMPLES records.
+            os.pwrite(stats_fd, pack_stats_sample(sample), next_slot * STATS_RECORD.size)
+            next_slot = (next_slot + 1) % MAX_STATS_SAMPLES
         except Exception as e:
             logging.error("Error in stats collection thread:", exc_info=True)
-            time.sleep(STATS_INTERVAL_SECONDS)
+    os.close(stats_fd)
+
+# --- Container List Cache ---
+# Keyed by selected project: (monotonic timestamp, generation, encoded JSON body).
+containers_cache = {}
+containers_cache_lock = threading.Lock()
+containers_refresh_lock = threading.Lock()
+# Bumped by every invalidation, so a listing fetched before an event is never stored as current.
+containers_generation = 0
+
+# --- Docker Events Watcher ---
+events_thread = None
+events_process = None
+stop_events_watch = threading.Event()
+events_watch_active = threading.Event()
+
+def watch_docker_events():
+    # One long-lived 'docker events' process tells us when the container list actually changes,
+    # so polls can be served from cache until then.
+    global events_process
+    cmd = ['docker', 'events', '--format', '{{json .}}', '--filter', 'type=container']
+    cmd += [arg for event in CONTAINER_STATE_EVENTS for arg in ('--filter', f'event={event}')]
+    retry_delay = DOCKER_EVENTS_RETRY_SECONDS
+    docker_missing_logged = False
+    while not stop_events_watch.is_set():
+        started = time.monotonic()
+        try:
+            events_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            events_watch_active.set()
+            # Anything may have changed while nobody was watching.
+            invalidate_containers_cache()
+            for line in events_process.stdout:
+                logging.debug("Docker event: %s", line.strip())
+                invalidate_containers_cache()
+            events_process.wait()
+            if time.monotonic() - started >= DOCKER_EVENTS_MAX_RETRY_SECONDS:
+                # A long-lived watch ended (e.g. the daemon restarted); reconnect promptly.
+                retry_delay = DOCKER_EVENTS_RETRY_SECONDS
+            if not stop_events_watch.is_set():
+                logging.warning(f"'docker events' exited with code {events_process.returncode}; retrying in {retry_delay}s.")
+        except FileNotFoundError:
+            if not docker_missing_logged:
+                logging.warning("docker was not found on PATH; the container list falls back to its short cache TTL.")
+                docker_missing_logged = True
+        except Exception as e:
+            logging.error("Error in docker events watcher:", exc_info=True)
+        finally:
+            events_watch_active.clear()
+        stop_events_watch.wait(retry_delay)
+        retry_delay = min(retry_delay * 2, DOCKER_EVENTS_MAX_RETRY_SECONDS)
+
+
+# --- Repository Cache ---
+repo_refresh_thread = None
+stop_repo_refresh = threading.Event()
+repo_cache_changed = threading.Event()
+repo_refresh_lock = threading.Lock()
+# TTL grown by cache hits, as (timestamp of the cache it applies to, ttl). Held in memory so
+# page views never rewrite REPO_CACHE_FILE; the next background refresh persists it.
+repo_cache_hit_ttl = None
+
+# One keep-alive session for all GitHub calls saves a DNS lookup and TLS handshake per request.
+github_session = requests.Session()
+github_session.headers['Authorization'] = f"bearer {config.GITHUB_PAT}"
+# Transient failures are retried on the pooled connection with backoff. The GraphQL
+# query is read-only, so retrying its POST is safe.
+github_retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=frozenset({'GET', 'POST'}), raise_on_status=False)
+github_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=github_retry))
+
+def fetch_repo_list():
+    # One GraphQL round-trip returns up to 100 repositories together with their emptiness flag.
+    repos = []
+    cursor = None
+    while True:
+        response = github_session.post(
+            GITHUB_GRAPHQL_URL,
+            json={'query': REPO_LIST_QUERY, 'variables': {'cursor': cursor}},
+            timeout=30
+        )
+        response.raise_for_status()
+        payload = json_loads(response.content)
+        if payload.get('errors'):
+            raise RuntimeError(payload['errors'][0].get('message', 'GitHub GraphQL query failed.'))
+        page = payload['data']['viewer']['repositories']
+        repos.extend({'name': node['name'], 'full_name': node['nameWithOwner']} for node in page['nodes'] if not node['isEmpty'])
+        if not page['pageInfo']['hasNextPage']:
+            return repos
+        cursor = page['pageInfo']['endCursor']
+
+def read_repo_cache():
+    try:
+        with open(REPO_CACHE_FILE, 'rb') as f:
+            cache = json_loads(f.read())
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        logging.warning(f"{REPO_CACHE_FILE} is corrupt; fetching the repository list again.", exc_info=True)
+        return None
+    # Caches written before the name index existed get one built on the fly.
+    cache.setdefault('index', {repo['name']: repo['full_name'] for repo in cache['repos']})
+    return cache
+
+def save_repo_cache(cache):
+    atomic_write(REPO_CACHE_FILE, json_dumps(cache))
+
+def repo_cache_age(cache):
+    return time.time() - cache.get('timestamp', 0)
+
+def repo_cache_ttl(cache):
+    if repo_cache_hit_ttl and repo_cache_hit_ttl[0] == cache.get('timestamp'):
+        return repo_cache_hit_ttl[1]
+    return cache.get('ttl', REPO_CACHE_EXPIRY_SECONDS)
+
+def repo_list_etag(known_etag=None):
+    # GitHub answers an unchanged listing with 304, which doesn't count against the rate limit.
+    headers = {'If-None-Match': known_etag} if known_etag else {}
+    response = github_session.get(GITHUB_REPOS_URL, headers=headers, timeout=30)
+    if response.status_code == 304:
+        return known_etag
+    response.raise_for_status()
+    return response.headers.get('ETag')
+
+def refresh_repo_cache(ttl=None):
+    previous = read_repo_cache()
+    # Background refreshes revalidate first, up to a full fetch every REPO_CACHE_FULL_FETCH_EVERY;
+    # manual ones always refetch.
+    revalidations = previous.get('revalidations', 0) if previous else 0
+    revalidate = previous and ttl is None and revalidations + 1 < REPO_CACHE_FULL_FETCH_EVERY
+    known_etag = previous.get('etag') if revalidate else None
+    etag = repo_list_etag(known_etag)
+    if known_etag and etag == known_etag:
+        repos = previous['repos']
+        revalidations += 1
+    else:
+        repos = fetch_repo_list()
+        revalidations = 0
+    with repo_refresh_lock:
+        if ttl is None:
+            # Background refreshes carry no staleness signal, so relax back to at least the default.
+            previous = read_repo_cache()
+            ttl = max(repo_cache_ttl(previous), REPO_CACHE_EXPIRY_SECONDS) if previous else REPO_CACHE_EXPIRY_SECONDS
+        cache = {
+            'timestamp': int(time.time()), 'ttl': ttl, 'etag': etag, 'revalidations': revalidations, 'repos': repos,
+            'index': {repo['name']: repo['full_name'] for repo in repos}
+        }
+        save_repo_cache(cache)
+    repo_cache_changed.set()
+    return cache
+
+def extend_repo_cache_ttl(cache):
+    # Every cache hit doubles the TTL; a manual refresh drops it back down. The refresher
+    # needn't be woken: it re-checks the TTL when its current wait ends.
+    global repo_cache_hit_ttl
+    with repo_refresh_lock:
+        repo_cache_hit_ttl = (cache.get('timestamp'), min(repo_cache_ttl(cache) * 2, REPO_CACHE_MAX_TTL_SECONDS))
+
+def record_repo_refresh_error(error):
+    # Lets page views tell a failed refresh apart from one that just hasn't run yet;
+    # the next successful refresh writes a cache without it.
+    with repo_refresh_lock:
+        cache = read_repo_cache()
+        if cache:
+            cache['refresh_error'] = str(error)
+            save_repo_cache(cache)
+
+def refresh_repo_cache_periodically():
+    # Renew the cache shortly before it expires so page loads never wait on GitHub.
+    while not stop_repo_refresh.is_set():
+        repo_cache_changed.clear()
+        try:
+            cache = read_repo_cache()
+            if cache:
+                ttl = repo_cache_ttl(cache)
+                wait = ttl - min(REPO_CACHE_REFRESH_LEAD_SECONDS, ttl // 2) - repo_cache_age(cache)
+            else:
+                wait = 0
+            if wait <= 0:
+                refresh_repo_cache()
+                logging.info("Repository cache refreshed in the background.")
+                continue
+            repo_cache_changed.wait(wait)
+        except Exception as e:
+            logging.error("Background repository cache refresh failed:", exc_info=True)
+            try:
+                record_repo_refresh_error(e)
+            except Exception:
+                logging.error("Could not record the repository refresh failure:", exc_info=True)
+            stop_repo_refresh.wait(REPO_CACHE_REFRESH_LEAD_SECONDS)
 
 # --- Authentication & Login ---
 @app.route('/login', methods=['GET', 'POST'])
@@ -84,125 +473,335 @@ def logout():
     session.pop('logged_in', None)
     return redirect(url_for('login'))
 
-def login_required(f):
-    def wrap(*args, **kwargs):
-        if 'logged_in' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    wrap.__name__ = f.__name__
-    return wrap
+# Every endpoint except these requires a logged-in session.
+PUBLIC_ENDPOINTS = {'login', 'static'}
+
+@app.before_request
+def require_login():
+    if request.endpoint not in PUBLIC_ENDPOINTS and 'logged_in' not in session:
+        return redirect(url_for('login'))
 
 # --- GitHub & Project Selection ---
 @app.route('/select_repo', methods=['GET', 'POST'])
-@login_required
 def select_repo():
-    if os.path.exists(REPO_CACHE_FILE):
-        flash("Using cached repository list. Click 'Refresh List' to fetch updates.", 'info')
-        with open(REPO_CACHE_FILE, 'r') as f:
-            cache = json.load(f)
-        cached_repos = cache['repos']
-    else:
+    # The page load right after a manual refresh isn't a cache hit.
+    just_refreshed = session.pop('repo_list_refreshed', False)
+    cache = read_repo_cache()
+    if cache is None:
         flash("Fetching fresh repository list from GitHub...", 'info')
-        g = Github(config.GITHUB_PAT)
         try:
-            user = g.get_user()
-            fetched_repos = []
-            for repo in user.get_repos():
-                try:
-                    repo.get_contents('/')
-                    fetched_repos.append({'name': repo.name, 'full_name': repo.full_name})
-                except GithubException as e:
-                    if e.status == 404 and "This repository is empty" in e.data.get("message", ""):
-                        continue
-                    else:
-                        flash(f"Error checking repo {repo.name}: {e.data.get('message', str(e))}", 'error')
-                        logging.error(f"GitHub API error on repo {repo.name}: {e}")
-            with open(REPO_CACHE_FILE, 'w') as f:
-                json.dump({'repos': fetched_repos}, f)
-            cached_repos = fetched_repos
+            cache = refresh_repo_cache()
         except Exception as e:
             flash(f"Error fetching repository list: {e}", 'error')
             logging.error("Failed to fetch repository list.", exc_info=True)
-            cached_repos = []
+    elif repo_cache_age(cache) > repo_cache_ttl(cache):
+        if cache.get('refresh_error'):
+            flash("Showing a stale repository list because GitHub could not be reached. Click 'Refresh List' to retry.", 'error')
+        else:
+            flash("Showing the cached repository list while it refreshes in the background.", 'info')
+    else:
+        flash("Using cached repository list. Click 'Refresh List' to fetch updates.", 'info')
+        if request.method == 'GET' and not just_refreshed:
+            extend_repo_cache_ttl(cache)
+    cached_repos = cache['repos'] if cache else []
+    repo_index = cache['index'] if cache else {}
             
     if request.method == 'POST':
         session['selected_repo'] = request.form['repo_name']
-        session['repo_full_name'] = next((r['full_name'] for r in cached_repos if r['name'] == session['selected_repo']), None)
+        session['repo_full_name'] = repo_index.get(session['selected_repo'])
         flash(f"Selected repository: {session['selected_repo']}")
         return redirect(url_for('cicd_dashboard'))
         
     return render_template('select_repo.html', repos=cached_repos, selected_repo=session.get('selected_repo'))
 
 @app.route('/refresh_repos', methods=['POST'])
-@login_required
 def refresh_repos():
-    if os.path.exists(REPO_CACHE_FILE):
-        os.remove(REPO_CACHE_FILE)
-        flash("Repository cache cleared.", 'success')
+    session['repo_list_refreshed'] = True
+    try:
+        refresh_repo_cache(ttl=REPO_CACHE_MANUAL_REFRESH_TTL_SECONDS)
+        flash("Repository list refreshed from GitHub.", 'success')
+    except Exception as e:
+        flash(f"Could not refresh from GitHub, keeping the cached list: {e}", 'error')
+        logging.error("Failed to refresh repository list.", exc_info=True)
     return redirect(url_for('select_repo'))
 
 # --- Main Dashboard ---
 @app.route('/')
 @app.route('/cicd')
-@login_required
 def cicd_dashboard():
     return render_template('cicd_dashboard.html', selected_repo=session.get('selected_repo'))
 
 # --- API Endpoints ---
 @app.route('/api/system_stats')
-@login_required
 def api_system_stats():
-    try:
-        if not os.path.exists(STATS_FILE):
-            return jsonify([])
-        with open(STATS_FILE, 'r') as f:
-            data = [json.loads(line) for line in f if line.strip()]
-        return jsonify(data)
-    except Exception as e:
-        logging.error("Error in /api/system_stats:", exc_info=True)
-        return jsonify({"error": "Failed to load system stats."} ), 500
+    body, gzipped_body = stats_payload
+    # Quality rather than membership: 'gzip;q=0' is listed but means the client refuses it.
+    if request.accept_encodings['gzip'] > 0:
+        response = Response(gzipped_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    return response
         
+def container_from_cli(record, selected_project_lower):
+    # Project one 'docker ps' record down to the fields the dashboard renders.
+    container_data = {field: record.get(field, '') for field in CONTAINER_FIELDS}
+    labels = dict(COMPOSE_LABEL_RE.findall(record.get('Labels', '')))
+    project_label = labels.get('project', '')
+    container_data['is_project_container'] = (selected_project_lower is not None and project_label.lower() == selected_project_lower)
+    container_data['compose_service'] = labels.get('service', '')
+    return container_data
+
+def list_containers_from_cli(selected_project):
+    cmd = ['docker', 'ps', '-a', '--format', '{{json .}}']
+    selected_project_lower = selected_project.lower() if selected_project else None
+    containers = []
+    error = None
+    # Parse records as docker prints them instead of buffering the whole listing first.
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        try:
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith(b'['):
+                    # Newer CLIs may print one JSON array; otherwise it's one object per line.
+                    records = json_loads(line + process.stdout.read())
+                else:
+                    records = (json_loads(line),)
+                containers.extend(container_from_cli(record, selected_project_lower) for record in records)
+        except json.JSONDecodeError as e:
+            process.kill()
+            error = f"Could not decode docker ps output: {e}"
+        stderr = process.stderr.read()
+    if error:
+        return None, error
+    if process.returncode != 0:
+        return None, stderr.decode(errors='replace')
+    return containers, None
+
+class DockerSocketConnection(http.client.HTTPConnection):
+    # HTTP over the Docker Engine's UNIX socket, so polling doesn't fork the docker CLI.
+    def __init__(self, socket_path, timeout=10):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+docker_engine_conn = None
+docker_engine_lock = threading.Lock()
+
+def docker_engine_get(path):
+    # One keep-alive connection is reused across polls. dockerd may drop it while idle,
+    # so a request that fails on a reused connection is retried once on a new one.
+    global docker_engine_conn
+    with docker_engine_lock:
+        for attempt in range(2):
+            if docker_engine_conn is None:
+                docker_engine_conn = DockerSocketConnection(DOCKER_SOCKET_PATH)
+            try:
+                docker_engine_conn.request('GET', path)
+                response = docker_engine_conn.getresponse()
+                body = response.read()
+                break
+            except Exception as e:
+                docker_engine_conn.close()
+                docker_engine_conn = None
+                if attempt or not isinstance(e, ConnectionError):
+                    raise
+    if response.status != 200:
+        raise RuntimeError(f"Docker Engine API returned {response.status}: {body[:200]!r}")
+    return json_loads(body)
+
+def format_engine_ports(ports):
+    # Match the 'Ports' column of 'docker ps'.
+    formatted = []
+    for port in ports:
+        if port.get('PublicPort'):
+            ip = port.get('IP', '')
+            host = f"[{ip}]" if ':' in ip else ip
+            formatted.append(f"{host}:{port['PublicPort']}->{port['PrivatePort']}/{port['Type']}")
+        else:
+            formatted.append(f"{port['PrivatePort']}/{port['Type']}")
+    return ', '.join(formatted)
+
+def list_containers_from_engine(selected_project):
+    selected_project_lower = selected_project.lower() if selected_project else None
+    containers = []
+    for container in docker_engine_get('/containers/json?all=1'):
+        labels = container.get('Labels') or {}
+        project_label = labels.get('com.docker.compose.project', '')
+        containers.append({
+            'ID': container['Id'][:12],
+            'Names': ','.join(name.lstrip('/') for name in container.get('Names') or []),
+            'Image': container.get('Image', ''),
+            'Ports': format_engine_ports(container.get('Ports') or []),
+            'State': container.get('State', ''),
+            'Status': container.get('Status', ''),
+            'is_project_container': (selected_project_lower is not None and project_label.lower() == selected_project_lower),
+            'compose_service': labels.get('com.docker.compose.service', ''),
+        })
+    return containers
+
+def use_engine_socket():
+    # DOCKER_HOST points the CLI somewhere else, so only use the local socket without it.
+    return not os.environ.get('DOCKER_HOST') and os.path.exists(DOCKER_SOCKET_PATH)
+
+def list_containers(selected_project):
+    if use_engine_socket():
+        try:
+            return list_containers_from_engine(selected_project), None
+        except (OSError, http.client.HTTPException, RuntimeError, ValueError) as e:
+            logging.warning(f"Docker Engine socket query failed, falling back to the docker CLI: {e}")
+    return list_containers_from_cli(selected_project)
+
+def running_container_ids():
+    if use_engine_socket():
+        try:
+            return [container['Id'] for container in docker_engine_get('/containers/json')]
+        except (OSError, http.client.HTTPException, RuntimeError, ValueError) as e:
+            logging.warning(f"Docker Engine socket query failed, falling back to the docker CLI: {e}")
+    result = subprocess.run(['docker', 'ps', '-q'], capture_output=True, text=True)
+    return result.stdout.split()
+
+def invalidate_containers_cache():
+    global containers_generation
+    with containers_cache_lock:
+        containers_generation += 1
+        containers_cache.clear()
+
+def cached_containers(selected_project):
+    with containers_cache_lock:
+        return containers_cache.get(selected_project)
+
+def is_fresh(cached):
+    if cached is None or cached[1] != containers_generation:
+        return False
+    # With the events watcher running, only the relative 'Up 5 minutes' status text can go stale.
+    ttl = CONTAINERS_CACHE_MAX_AGE_SECONDS if events_watch_active.is_set() else CONTAINERS_CACHE_TTL_SECONDS
+    return time.monotonic() - cached[0] < ttl
+
 @app.route('/api/containers')
-@login_required
 def api_containers():
     selected_project = session.get('selected_repo')
-    try:
-        cmd = ['docker', 'ps', '-a', '--format', '{{json .}}']
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            logging.error(f"Docker ps failed: {result.stderr}")
-            return jsonify({'error': 'Failed to get container status', 'details': result.stderr}), 500
-        
-        containers = []
-        for line in result.stdout.strip().split('\n'):
-            if line:
-                try:
-                    container_data = json.loads(line)
-                    labels_str = container_data.get('Labels', '')
-                    project_label = ''
-                    service_label = ''
-                    for label in labels_str.split(','):
-                        if 'com.docker.compose.project=' in label:
-                            project_label = label.split('=')[-1]
-                        if 'com.docker.compose.service=' in label:
-                            service_label = label.split('=')[-1]
-                    container_data['is_project_container'] = (selected_project is not None and project_label.lower() == selected_project.lower())
-                    container_data['compose_service'] = service_label
-                    containers.append(container_data)
-                except json.JSONDecodeError:
-                    logging.warning(f"Could not decode JSON line from docker ps: {line}")
-        return jsonify(containers)
-    except Exception as e:
-        logging.error("Error in /api/containers:", exc_info=True)
-        return jsonify({"error": "Failed to load container data."} ), 500
+    cached = cached_containers(selected_project)
+    if is_fresh(cached):
+        return Response(cached[2], mimetype='application/json')
+    # Single-flight: concurrent misses wait here and reuse the first caller's result
+    # instead of each running docker.
+    with containers_refresh_lock:
+        cached = cached_containers(selected_project)
+        if is_fresh(cached):
+            return Response(cached[2], mimetype='application/json')
+        try:
+            generation = containers_generation
+            containers, error = list_containers(selected_project)
+            if error is not None:
+                logging.error(f"Docker ps failed: {error}")
+                if cached:
+                    logging.warning("Serving stale container list after docker ps failure.")
+                    return Response(cached[2], mimetype='application/json')
+                return jsonify({'error': 'Failed to get container status', 'details': error}), 500
+            # Encode once; every poll until the next refresh is served these bytes as they are.
+            body = json_dumps(containers)
+            with containers_cache_lock:
+                containers_cache[selected_project] = (time.monotonic(), generation, body)
+            return Response(body, mimetype='application/json')
+        except Exception as e:
+            logging.error("Error in /api/containers:", exc_info=True)
+            if cached:
+                return Response(cached[2], mimetype='application/json')
+            return jsonify({"error": "Failed to load container data."} ), 500
+
+def format_sse(text):
+    # Every line of a multi-line payload needs its own 'data: ' prefix to stay in one event.
+    return 'data: ' + text.replace('\n', '\ndata: ') + '\n\n'
+
+def format_sse_bytes(data):
+    # format_sse for raw process output, so it reaches the client without a decode/encode round trip.
+    return b''.join((SSE_PREFIX, data.replace(b'\n', SSE_LINE_BREAK), SSE_SUFFIX))
+
+@functools.lru_cache(maxsize=128)
+def deploy_paths(repo_name):
+    deploy_path = os.path.join(DEPLOY_ROOT, repo_name)
+    return deploy_path, os.path.join(deploy_path, COMPOSE_FILE_NAME)
+
+def is_git_checkout(deploy_path):
+    return os.path.exists(os.path.join(deploy_path, '.git'))
+
+def list_directory(path):
+    # Same suffixes as 'ls -F', without forking ls: '/' dirs, '@' symlinks, '*' executables.
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_symlink():
+                suffix = '@'
+            elif entry.is_dir():
+                suffix = '/'
+            elif os.access(entry.path, os.X_OK):
+                suffix = '*'
+            else:
+                suffix = ''
+            entries.append(entry.name + suffix)
+    return '\n'.join(sorted(entries))
 
 def stream_process(command, cwd=None):
-    logging.debug(f"Streaming command: {' '.join(command)}")
+    logging.debug("Streaming command: %s", ' '.join(command))
     try:
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, cwd=cwd, bufsize=1)
-        for line in iter(process.stdout.readline, ''):
-            logging.debug(f"Streamed line: {line.strip()}")
-            yield f"data: {line}\n\n"
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=cwd)
+        fd = process.stdout.fileno()
+        os.set_blocking(fd, False)
+        # Output stays bytes end to end; EventSource decodes it as UTF-8 in the browser.
+        pending = b''
+        batch = []
+        batch_size = 0
+        last_flush = time.monotonic()
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                # Block until the pending batch is due, or until an idle stream needs a keep-alive.
+                idle_limit = SSE_FLUSH_SECONDS if batch else SSE_KEEPALIVE_SECONDS
+                timeout = max(0, idle_limit - (time.monotonic() - last_flush))
+                if selector.select(timeout):
+                    try:
+                        chunk = os.read(fd, 65536)
+                    except BlockingIOError:
+                        continue
+                    if not chunk:
+                        break
+                    data = pending + chunk
+                    # A trailing \r may be the first half of a \r\n split across reads; hold it back.
+                    held = b'\r' if data.endswith(b'\r') else b''
+                    if held:
+                        data = data[:-1]
+                    # SSE treats a bare \r as a line break too, so fold \r\n and \r (progress output) into \n.
+                    data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+                    complete, newline, pending = data.rpartition(b'\n')
+                    pending += held
+                    if newline:
+                        batch.append(complete)
+                        batch_size += len(complete)
+                elif not batch:
+                    # SSE comment line: EventSource ignores it, but proxies see traffic on a quiet stream.
+                    yield SSE_KEEPALIVE
+                    last_flush = time.monotonic()
+                    continue
+                # Coalesce bursts into one event per SSE_FLUSH_BYTES or SSE_FLUSH_SECONDS.
+                if batch and (batch_size >= SSE_FLUSH_BYTES or time.monotonic() - last_flush >= SSE_FLUSH_SECONDS):
+                    yield format_sse_bytes(b'\n'.join(batch))
+                    batch = []
+                    batch_size = 0
+                    last_flush = time.monotonic()
+        pending = pending.rstrip(b'\r')
+        if pending:
+            batch.append(pending)
+        if batch:
+            yield format_sse_bytes(b'\n'.join(batch))
+        process.stdout.close()
         process.wait()
     except Exception as e:
         logging.error(f"Error streaming process", exc_info=True)
@@ -216,10 +815,13 @@ def action_streamer(action_generator):
             logging.error("Unhandled error in action stream:", exc_info=True)
             yield f"data: --- PYTHON TRACEBACK ---\\n\n"
             yield f"data: An unhandled error occurred. See sakadeploy.log for details.\n\n"
-    return Response(generate(), mimetype='text/event-stream')
+        finally:
+            # Actions change container state; don't let the dashboard show a stale list.
+            invalidate_containers_cache()
+    # Keep the request context (session, request) available while the stream runs.
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
 @app.route('/api/container_action/<container_id>/<action>', methods=['GET'])
-@login_required
 def api_container_action(container_id, action):
     service_name = request.args.get('service_name')
     repo_name = session.get('selected_repo')
@@ -228,12 +830,11 @@ def api_container_action(container_id, action):
             if not repo_name or not service_name:
                 yield "data: Error: A project and service must be selected to rebuild.\n\n"
                 return
-            deploy_path = os.path.join('/var/deploy', repo_name)
-            compose_file = os.path.join(deploy_path, 'docker-compose.yml')
+            deploy_path, compose_file = deploy_paths(repo_name)
             yield f"data: --- Step 1: Rebuilding service '{service_name}' with no cache ---\\n\n"
-            yield from stream_process(['docker', 'compose', '-f', compose_file, 'build', '--no-cache', service_name], cwd=deploy_path)
+            yield from stream_process((*DOCKER_COMPOSE, '-f', compose_file, 'build', '--no-cache', service_name), cwd=deploy_path)
             yield f"data: \n--- Step 2: Re-creating and starting service '{service_name}' ---\\n\n"
-            yield from stream_process(['docker', 'compose', '-f', compose_file, 'up', '-d', '--force-recreate', service_name], cwd=deploy_path)
+            yield from stream_process((*DOCKER_COMPOSE, '-f', compose_file, 'up', '-d', '--force-recreate', service_name), cwd=deploy_path)
             yield f"data: \n--- Rebuild of '{service_name}' complete ---\\n\n"
         elif action == 'rm':
             yield f"data: --- Stopping container {container_id[:12]} ---\\n\n"
@@ -254,17 +855,16 @@ def api_container_action(container_id, action):
     return action_streamer(generator)
 
 @app.route('/run_git_action/<action>', methods=['GET'])
-@login_required
 def run_git_action(action):
     repo_name = session.get('selected_repo')
     if not repo_name:
         return Response("data: Error: No repository selected. Please select one first.\n\n", mimetype='text/event-stream')
     repo_full_name = session.get('repo_full_name')
-    deploy_path = os.path.join('/var/deploy', repo_name)
+    deploy_path, _ = deploy_paths(repo_name)
     def generator():
         if action == 'pull':
             yield "data: --- Checking local repository ---\\n\n"
-            if not os.path.exists(os.path.join(deploy_path, '.git')):
+            if not is_git_checkout(deploy_path):
                 yield f"data: No local repository found. Cloning instead of pulling...\n\n"
                 if not repo_full_name:
                     yield "data: Error: Repo full name not in session. Cannot clone.\n\n"
@@ -273,12 +873,12 @@ def run_git_action(action):
                 os.makedirs(deploy_path, exist_ok=True)
                 yield from stream_process(['git', 'clone', git_url, '.'], cwd=deploy_path)
                 yield "data: \n--- Repository contents after clone: ---\\n\n"
-                yield from stream_process(['ls', '-aF'], cwd=deploy_path)
+                yield format_sse(list_directory(deploy_path))
             else:
                 yield "data: --- Pulling latest changes from repository ---\\n\n"
                 yield from stream_process(['git', 'pull'], cwd=deploy_path)
                 yield "data: \n--- Repository contents after pull: ---\\n\n"
-                yield from stream_process(['ls', '-aF'], cwd=deploy_path)
+                yield format_sse(list_directory(deploy_path))
             yield "data: \n--- Git operation complete ---\\n\n"
         elif action == 'delete_repo':
             yield f"data: --- Deleting local repository at {deploy_path} ---\\n\n"
@@ -291,13 +891,13 @@ def run_git_action(action):
     return action_streamer(generator)
 
 @app.route('/run_docker_action/<action>', methods=['GET'])
-@login_required
 def run_docker_action(action):
     repo_name = session.get('selected_repo')
     if not repo_name and action not in ['prune_images', 'prune_containers']:
          return Response("data: Error: No repository selected. Please select one first.\n\n", mimetype='text/event-stream')
     repo_full_name = session.get('repo_full_name')
-    deploy_path = os.path.join('/var/deploy', repo_name)
+    # The global prune actions run without a selected repository.
+    deploy_path, compose_file = deploy_paths(repo_name) if repo_name else (None, None)
     def generator():
         if repo_name:
             os.makedirs(deploy_path, exist_ok=True)
@@ -308,75 +908,94 @@ def run_docker_action(action):
                 return
             git_url = f"https://{config.GITHUB_PAT}@github.com/{repo_full_name}.git"
             yield "data: --- Starting Full Redeployment ---\\n\n"
-            if not os.path.exists(os.path.join(deploy_path, '.git')):
+            if not is_git_checkout(deploy_path):
                 yield f"data: Step 1: Cloning repository...\n\n"
                 yield from stream_process(['git', 'clone', git_url, '.'], cwd=deploy_path)
             else:
                 yield f"data: Step 1: Pulling latest changes...\n\n"
                 yield from stream_process(['git', 'pull'], cwd=deploy_path)
             yield "data: \n--- Step 2: Building and starting containers ---\\n\n"
-            yield from stream_process(['docker', 'compose', '-f', os.path.join(deploy_path, 'docker-compose.yml'), 'up', '--build', '-d', '--force-recreate'], cwd=deploy_path)
+            yield from stream_process((*DOCKER_COMPOSE, '-f', compose_file, 'up', '--build', '-d', '--force-recreate'), cwd=deploy_path)
             yield "data: \n--- Redeployment complete ---\\n\n"
         elif action == 'logs':
             if not repo_name:
                 yield "data: Error: No project selected for docker-compose logs.\n\n"
                 return
             yield f"data: --- Streaming logs for project {repo_name} ---\\n\n"
-            cmd = ['docker', 'compose', '-f', os.path.join(deploy_path, 'docker-compose.yml'), 'logs', '--follow', '--tail=100']
+            cmd = (*DOCKER_COMPOSE, '-f', compose_file, 'logs', '--follow', '--tail=100')
             yield from stream_process(cmd, cwd=deploy_path)
         else:
-             cmd_map = {
-                'start': ['start'],
-                'stop': ['stop'],
-                'prune': ['down', '--remove-orphans'],
-                'build_no_cache': ['build', '--no-cache'],
-                'prune_images': ['image', 'prune', '-a', '-f'],
-                'prune_containers': ['container', 'prune', '-f']
-             }
-             if action not in cmd_map:
+             if action not in DOCKER_ACTION_ARGS:
                  yield "data: Error: Unknown command.\n\n"
                  return
              
              if action == 'prune_containers':
                  yield "data: --- Stopping all running containers first ---\\n\n"
-                 get_ids_cmd = ['docker', 'ps', '-q']
-                 id_process = subprocess.run(get_ids_cmd, capture_output=True, text=True)
-                 container_ids = id_process.stdout.strip().split()
-                 if container_ids and container_ids[0]:
-                     yield from stream_process(['docker', 'stop'] + container_ids)
+                 container_ids = running_container_ids()
+                 if container_ids:
+                     # One 'docker stop' for all of them; the daemon stops them in parallel.
+                     yield from stream_process(['docker', 'stop', *container_ids])
                  else:
                      yield "data: No running containers to stop.\n\n"
                  
-                 full_cmd = ['docker'] + cmd_map[action]
+                 full_cmd = ('docker', *DOCKER_ACTION_ARGS[action])
                  yield f"data: --- Running global command: '{' '.join(full_cmd)}' ---\\n\n"
                  yield from stream_process(full_cmd)
 
              elif action == 'prune_images':
-                 full_cmd = ['docker'] + cmd_map[action]
+                 full_cmd = ('docker', *DOCKER_ACTION_ARGS[action])
                  yield f"data: --- Running global command: '{' '.join(full_cmd)}' ---\\n\n"
                  yield from stream_process(full_cmd)
              else:
                  # Project-specific docker-compose commands
-                 full_cmd = ['docker', 'compose', '-f', os.path.join(deploy_path, 'docker-compose.yml')] + cmd_map[action]
+                 full_cmd = (*DOCKER_COMPOSE, '-f', compose_file, *DOCKER_ACTION_ARGS[action])
                  yield f"data: --- Running 'docker-compose {action}' ---\\n\n"
                  yield from stream_process(full_cmd, cwd=deploy_path)
              yield f"data: \n--- Command '{action}' complete ---\\n\n"
     return action_streamer(generator)
 
+def start_background_threads():
+    global stats_thread, repo_refresh_thread, events_thread
+    if config.ENABLE_STATS:
+        stats_thread = threading.Thread(target=collect_system_stats)
+        stats_thread.daemon = True
+        stats_thread.start()
+    else:
+        logging.info("System monitoring disabled by config.ENABLE_STATS.")
+    repo_refresh_thread = threading.Thread(target=refresh_repo_cache_periodically)
+    repo_refresh_thread.daemon = True
+    repo_refresh_thread.start()
+    events_thread = threading.Thread(target=watch_docker_events)
+    events_thread.daemon = True
+    events_thread.start()
+
+def stop_background_threads():
+    stop_stats_thread.set()
+    stop_repo_refresh.set()
+    repo_cache_changed.set()
+    stop_events_watch.set()
+    if stats_thread:
+        stats_thread.join()
+    if events_process and events_process.poll() is None:
+        events_process.terminate()
+    if repo_refresh_thread:
+        repo_refresh_thread.join()
+    if events_thread:
+        events_thread.join()
+
 if __name__ == '__main__':
+    # Development entry point; the systemd service runs gunicorn with gunicorn.conf.py.
     logging.info("Starting Sakadeploy application with System Monitoring.")
-    stats_thread = threading.Thread(target=collect_system_stats)
-    stats_thread.daemon = True
-    stats_thread.start()
+    start_background_threads()
     
+    cert_file, key_file = 'certs/cert.pem', 'certs/key.pem'
     try:
-        app.run(host='0.0.0.0', port=8123, debug=False, ssl_context=('certs/cert.pem', 'certs/key.pem'))
-    except FileNotFoundError:
-        logging.warning("SSL certificate/key not found. Running in debug mode without SSL.")
-        app.run(host='0.0.0.0', port=8123, debug=True)
+        if os.path.exists(cert_file) and os.path.exists(key_file):
+            WSGIServer(('0.0.0.0', 8123), app, certfile=cert_file, keyfile=key_file).serve_forever()
+        else:
+            logging.warning("SSL certificate/key not found. Running in debug mode without SSL.")
+            app.run(host='0.0.0.0', port=8123, debug=True)
     except Exception as e:
         logging.critical("Application failed to start.", exc_info=True)
     finally:
-        stop_stats_thread.set()
-        if stats_thread:
-            stats_thread.join()
\ No newline at end of file
+        stop_background_threads()
@@ -2,13 +2,20 @@
 # deploy.py
 import os
 import getpass
+import re
 import subprocess
 import sys
 import time
-from github import Github, BadCredentialsException
-from generate_certs import generate_self_signed_cert
 from pathlib import Path
 
+SERVICE_NAME = "cicd_interface.service"
+PROJECT_DIR = Path(__file__).resolve().parent
+VENV_DIR = PROJECT_DIR / '.venv'
+VENV_PYTHON = VENV_DIR / 'bin' / 'python3'
+GUNICORN_CONF = PROJECT_DIR / 'gunicorn.conf.py'
+# Optional offline wheelhouse, built beforehand with: pip wheel -r requirements.txt -w wheels/
+WHEELS_DIR = 'wheels'
+
 def check_for_sudo():
     """Checks if the script is run with sudo privileges."""
     if os.geteuid() != 0:
@@ -23,6 +30,9 @@ def prompt_for_github_pat():
         if not pat:
             print("PAT cannot be empty.")
             continue
+        # Imported only once a PAT is in hand, so the first prompt appears without waiting
+        # on PyGithub and requests loading.
+        from github import Github, BadCredentialsException
         try:
             g = Github(pat)
             user = g.get_user()
@@ -49,20 +59,19 @@ def prompt_for_admin_password():
 
 def update_config_file(pat, password):
     """Updates the config.py file with the provided PAT and password."""
-    config_path = 'config.py'
+    config_path = Path('config.py')
     try:
         # Use existing config content as a base
-        with open(config_path, 'r') as f:
-            lines = f.readlines()
-
-        with open(config_path, 'w') as f:
-            for line in lines:
-                if line.strip().startswith('GITHUB_PAT'):
-                    f.write(f'GITHUB_PAT = "{pat}"\n')
-                elif line.strip().startswith('ADMIN_PASSWORD'):
-                    f.write(f'ADMIN_PASSWORD = "{password}"\n')
-                else:
-                    f.write(line)
+        text = config_path.read_text()
+        # Lambdas keep backslashes in the values from being read as regex escapes.
+        text = re.sub(r'^[ \t]*GITHUB_PAT\s*=.*$', lambda m: f'GITHUB_PAT = "{pat}"', text, flags=re.M)
+        text = re.sub(r'^[ \t]*ADMIN_PASSWORD\s*=.*$', lambda m: f'ADMIN_PASSWORD = "{password}"', text, flags=re.M)
+
+        # Write a temp file and swap it in, so a crash never leaves config.py half-written.
+        tmp_path = config_path.with_name(config_path.name + '.tmp')
+        tmp_path.write_text(text)
+        tmp_path.chmod(config_path.stat().st_mode)
+        os.replace(tmp_path, config_path)
         print(f"Successfully updated {config_path}")
         return True
     except Exception as e:
@@ -70,42 +79,53 @@ def update_config_file(pat, password):
         return False
 
 def run_command(command, check=True):
-    """Runs a shell command and prints its output."""
-    print(f"Running command: {' '.join(command)}")
-    process = subprocess.run(command, capture_output=True, text=True)
-    if process.stdout:
-        print(process.stdout)
-    if process.stderr:
-        print(process.stderr, file=sys.stderr)
+    """Runs a shell command and streams its output as it is produced."""
+    print(f"Running command: {' '.join(map(str, command))}")
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1) as process:
+        for line in process.stdout:
+            sys.stdout.write(line)
     if check and process.returncode != 0:
         raise subprocess.CalledProcessError(process.returncode, command)
     return process
 
+def wait_for_service_active(service, timeout=10):
+    """Polls the service until systemd reports it active, backing off from 50ms to 200ms."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    polls = 0
+    while True:
+        state = subprocess.run(["systemctl", "is-active", service], capture_output=True, text=True).stdout.strip()
+        if state == "active" or state == "failed" or time.monotonic() >= deadline:
+            return state
+        polls += 1
+        if polls == 4:
+            delay = 0.1
+        elif polls == 20:
+            delay = 0.2
+        time.sleep(delay)
+
 def create_systemd_service_file():
     """Creates the systemd service file content."""
-    project_dir = os.path.abspath(os.path.dirname(__file__))
-    venv_python_path = os.path.join(project_dir, '.venv', 'bin', 'python3')
-    
+    user = getpass.getuser()  # One passwd lookup for both User= and Group=
     service_content = f"""
 [Unit]
 Description=CICD Management Interface
 After=network.target
 
 [Service]
-User={getpass.getuser()}
-Group={getpass.getuser()}
-WorkingDirectory={project_dir}
-ExecStart={venv_python_path} {os.path.join(project_dir, 'app.py')}
+User={user}
+Group={user}
+WorkingDirectory={PROJECT_DIR}
+ExecStart={VENV_PYTHON} -m gunicorn -c {GUNICORN_CONF} app:app
 Restart=always
 
 [Install]
 WantedBy=multi-user.target
 """
-    service_file_path = "/etc/systemd/system/cicd_interface.service"
+    service_file_path = f"/etc/systemd/system/{SERVICE_NAME}"
     print(f"Creating systemd service file at {service_file_path}...")
     try:
-        with open(service_file_path, "w") as f:
-            f.write(service_content)
+        Path(service_file_path).write_text(service_content)
         print("Service file created successfully.")
     except Exception as e:
         print(f"Error creating service file: {e}", file=sys.stderr)
@@ -134,10 +154,14 @@ def main():
         return
 
     # 4. Generate SSL certificates
+    # Imported here so the prompts above don't wait on cryptography loading.
+    from generate_certs import generate_self_signed_cert
     certs_path = Path("certs")
     try:
-        generate_self_signed_cert(certs_path)
-        print(f"Self-signed SSL certificate and key generated in {certs_path.absolute()}")
+        if generate_self_signed_cert(certs_path):
+            print(f"Self-signed SSL certificate and key generated in {certs_path.absolute()}")
+        else:
+            print(f"Keeping the existing SSL certificate and key in {certs_path.absolute()}")
     except Exception as e:
         print(f"An error occurred during certificate generation: {e}")
         print("Setup failed.")
@@ -149,24 +173,27 @@ def main():
     try:
         # 6. Create virtual environment
         print("\n--- Setting up Python Virtual Environment ---")
-        run_command(["python3", "-m", "venv", ".venv"])
+        run_command(["python3", "-m", "venv", VENV_DIR])
 
         # 7. Install dependencies into the virtual environment
         print("\n--- Installing Dependencies ---")
-        pip_executable = os.path.join(".venv", "bin", "pip")
-        run_command([pip_executable, "install", "-r", "requirements.txt"])
+        pip_install = [VENV_PYTHON, "-m", "pip", "install"]
+        if os.path.isdir(WHEELS_DIR):
+            # Install from the bundled wheels without contacting PyPI.
+            pip_install += ["--no-index", "--find-links", WHEELS_DIR]
+        run_command(pip_install + ["-r", "requirements.txt"])
 
         # 8. Set up systemd service
         print("\n--- Setting up Systemd Service ---")
         create_systemd_service_file()
         run_command(["systemctl", "daemon-reload"])
-        run_command(["systemctl", "enable", "cicd_interface.service"])
-        run_command(["systemctl", "start", "cicd_interface.service"])
+        run_command(["systemctl", "enable", "--now", SERVICE_NAME])
         
         print("\n--- Verifying Service Status ---")
-        print("Waiting a moment for the service to initialize...")
-        time.sleep(5) # Give the service a few seconds to start
-        run_command(["systemctl", "status", "cicd_interface.service"], check=False)
+        print("Waiting for the service to initialize...")
+        state = wait_for_service_active(SERVICE_NAME)
+        print(f"Service state: {state}")
+        run_command(["systemctl", "status", SERVICE_NAME, "--no-pager"], check=False)
 
         print("\n--- Setup Complete! ---")
         print("The CICD Management Interface is now running as a system service.")
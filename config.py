@@ -4,3 +4,4 @@ GITHUB_PAT = "YOUR_GITHUB_PAT"
 ADMIN_PASSWORD = "YOUR_ADMIN_PASSWORD"
 REPO_WORKFLOW_FILE = "docker-compose.yml" # File to check for repository compatibility
 SELECTED_REPO = None # Will be populated after selection
+ENABLE_STATS = True # Set to False to turn off the system monitoring collector
@@ -51,7 +51,8 @@ function cleanup() {
     # Use git to revert config.py to its original state, ignoring errors if not a git repo
     git checkout HEAD -- config.py &> /dev/null || echo -e "${YELLOW}   Warning: Could not reset config.py via git. Proceeding anyway.${NC}"
     rm -rf certs
-    rm -f system_stats.log
+    rm -f system_stats.log system_stats.bin
+    rm -f secret_key.bin
     echo -e "${GREEN}   Cleanup complete.${NC}"
 }
 
@@ -100,7 +101,7 @@ fi
 # --- 2. Install Python Dependencies ---
 echo -e "\n${BLUE}>>> 2. Installing Python dependencies...${NC}"
 pip3 install --break-system-packages -r requirements.txt > /dev/null
-echo -e "${GREEN}   Python dependencies installed (Flask, PyGithub, cryptography, psutil).${NC}"
+echo -e "${GREEN}   Python dependencies installed (Flask, PyGithub, requests, cryptography, psutil, orjson, gevent, gunicorn).${NC}"
 
 # --- 2b. Create Log File ---
 echo -e "\n${BLUE}>>> Creating dedicated log file...${NC}"
@@ -174,7 +175,7 @@ After=network.target
 User=$SERVICE_USER
 Group=$(id -gn "$SERVICE_USER")
 WorkingDirectory=$PROJECT_DIR
-ExecStart=/usr/bin/python3 $PROJECT_DIR/app.py
+ExecStart=/usr/bin/python3 -m gunicorn -c $PROJECT_DIR/gunicorn.conf.py app:app
 Restart=always
 RestartSec=5
 [Install]
@@ -1,21 +1,41 @@
-import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 from cryptography import x509
-from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec
+
+# An existing certificate closer than this to expiry is replaced rather than kept.
+CERT_RENEW_BEFORE = timedelta(days=30)
+
+def cert_not_valid_after(cert):
+    # not_valid_after_utc only exists from cryptography 42; distro packages are often older.
+    try:
+        return cert.not_valid_after_utc
+    except AttributeError:
+        return cert.not_valid_after.replace(tzinfo=timezone.utc)
 
 def generate_self_signed_cert(cert_dir: Path):
-    """Generates a self-signed SSL certificate and key."""
-    # Generate our key
-    key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
-    )
+    """Generates a self-signed SSL certificate and key, unless a valid pair already exists.
+
+    Returns True if a new pair was written, False if the existing one was kept.
+    """
+    now = datetime.now(timezone.utc)
+    cert_path = cert_dir / "cert.pem"
+    if cert_path.exists() and (cert_dir / "key.pem").exists():
+        try:
+            existing = x509.load_pem_x509_certificate(cert_path.read_bytes())
+        except ValueError:
+            existing = None  # Unreadable certificate; replace it
+        if existing is not None and cert_not_valid_after(existing) - now > CERT_RENEW_BEFORE:
+            return False
+
+    # Generate our key. P-256 generates in well under a millisecond where RSA-2048 takes
+    # up to seconds, and unlike Ed25519 it is accepted by browsers for TLS.
+    key = ec.generate_private_key(ec.SECP256R1())
 
     # Create a self-signed certificate
+    serial_number = x509.random_serial_number()
     subject = issuer = x509.Name([
         x509.NameAttribute(x509.NameOID.COUNTRY_NAME, u"US"),
         x509.NameAttribute(x509.NameOID.STATE_OR_PROVINCE_NAME, u"Anywhere"),
@@ -30,28 +50,29 @@ def generate_self_signed_cert(cert_dir: Path):
     ).public_key(
         key.public_key()
     ).serial_number(
-        x509.random_serial_number()
+        serial_number
     ).not_valid_before(
-        datetime.datetime.utcnow()
+        now
     ).not_valid_after(
-        datetime.datetime.utcnow() + datetime.timedelta(days=365)  # Valid for 1 year
+        now + timedelta(days=365)  # Valid for 1 year
     ).add_extension(
         x509.SubjectAlternativeName([x509.DNSName(u"localhost")]),
         critical=False,
-    ).sign(key, hashes.SHA256(), default_backend())
+    ).sign(key, hashes.SHA256())
 
     # Write our certificate and key
     cert_dir.mkdir(parents=True, exist_ok=True)
-    with open(cert_dir / "cert.pem", "wb") as f:
-        f.write(cert.public_bytes(serialization.Encoding.PEM))
-    with open(cert_dir / "key.pem", "wb") as f:
-        f.write(key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.NoEncryption(),
-        ))
+    (cert_dir / "cert.pem").write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    (cert_dir / "key.pem").write_bytes(key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    ))
+    return True
 
 if __name__ == "__main__":
     certs_path = Path("certs")
-    generate_self_signed_cert(certs_path)
-    print(f"Self-signed certificate and key generated in {certs_path.absolute()}")
+    if generate_self_signed_cert(certs_path):
+        print(f"Self-signed certificate and key generated in {certs_path.absolute()}")
+    else:
+        print(f"Keeping the existing certificate and key in {certs_path.absolute()}")
@@ -0,0 +1,26 @@
+# Gunicorn settings for the systemd service: gunicorn -c gunicorn.conf.py app:app
+import logging
+import os
+
+bind = '0.0.0.0:8123'
+# One worker: the stats history, repo cache and container cache live in process memory.
+# gevent lets that worker hold many long-lived SSE streams at once.
+workers = 1
+worker_class = 'gevent'
+worker_connections = 200
+keepalive = 75
+# SSE streams (docker logs --follow) stay open indefinitely.
+timeout = 0
+
+if os.path.exists('certs/cert.pem') and os.path.exists('certs/key.pem'):
+    certfile = 'certs/cert.pem'
+    keyfile = 'certs/key.pem'
+
+def post_worker_init(worker):
+    import app
+    logging.info("Starting Sakadeploy application with System Monitoring.")
+    app.start_background_threads()
+
+def worker_exit(server, worker):
+    import app
+    app.stop_background_threads()